@@ -0,0 +1,137 @@
+# app/binned_fit.py
+import time
+
+import numpy as np
+from scipy.optimize import curve_fit
+
+
+DEFAULT_NUM_BINS = 200
+MIN_NUM_BINS = 4  # More bins than the largest curve_fit model has parameters (3)
+
+
+def bin_data(x_data, y_data, num_bins=DEFAULT_NUM_BINS):
+    """
+    Aggregates (x, y) into adaptive x-bins holding roughly equal sample counts.
+
+    Bin edges are x quantiles, so dense regions get narrow bins. When x has no
+    more distinct values than num_bins (e.g. a stepped sweep with repeated
+    readings), each distinct x gets its own bin so no two levels are merged.
+    Counts, x sums and y sums come from bincounts; the variance comes from a
+    further bincount of squared deviations from each bin's own mean.
+
+    Returns (x_mean, y_mean, y_sigma, counts) for the non-empty bins, where
+    y_sigma is the standard error of each bin's y mean. Bins with no variance
+    estimate (one sample, or identical samples) get the pooled within-bin
+    spread; y_sigma is None when the data has no spread at all.
+    """
+    x = np.asarray(x_data, dtype=float)
+    y = np.asarray(y_data, dtype=float)
+    if len(x) == 0:
+        raise ValueError("Cannot bin empty data.")
+
+    edges = np.unique(np.quantile(x, np.linspace(0.0, 1.0, num_bins + 1)))
+    levels = np.unique(x) if len(edges) < num_bins + 1 else None  # Collapsed edges hint at repeated x values
+    if levels is not None and len(levels) <= num_bins:
+        n_bins = len(levels)
+        idx = np.searchsorted(levels, x)
+    else:
+        n_bins = max(len(edges) - 1, 1)
+        idx = np.searchsorted(edges[1:-1], x, side='right')
+
+    counts = np.bincount(idx, minlength=n_bins).astype(float)
+    sum_x = np.bincount(idx, weights=x, minlength=n_bins)
+    sum_y = np.bincount(idx, weights=y, minlength=n_bins)
+    y_mean_all = sum_y / np.maximum(counts, 1.0)
+    sq_dev = np.bincount(idx, weights=(y - y_mean_all[idx]) ** 2, minlength=n_bins)
+
+    filled = counts > 0
+    counts, sum_x, y_mean, sq_dev = counts[filled], sum_x[filled], y_mean_all[filled], sq_dev[filled]
+    x_mean = sum_x / counts
+
+    has_var = (counts > 1) & (sq_dev > 0)
+    if not np.any(has_var):
+        return x_mean, y_mean, None, counts
+
+    variance = np.zeros_like(counts)
+    variance[has_var] = sq_dev[has_var] / (counts[has_var] - 1)
+    pooled_var = np.sum(sq_dev[has_var]) / np.sum(counts[has_var] - 1)
+    variance[~has_var] = pooled_var
+    y_sigma = np.sqrt(variance / counts)
+    return x_mean, y_mean, y_sigma, counts
+
+
+def fit_curve(model, x, y, sigma=None, refine_data=None, **curve_fit_kwargs):
+    """
+    curve_fit wrapper for the approximate (binned) mode.
+
+    sigma weights the fit by inverse variance. If refine_data=(x_full, y_full)
+    is given, one more unweighted fit runs on the full data, starting from the
+    parameters of the first fit.
+    """
+    popt, pcov = curve_fit(model, x, y, sigma=sigma, **curve_fit_kwargs)
+    if refine_data is not None:
+        curve_fit_kwargs['p0'] = popt
+        popt, pcov = curve_fit(model, refine_data[0], refine_data[1], **curve_fit_kwargs)
+    return popt, pcov
+
+
+def benchmark_binned_fit(model, x_data, y_data, p0=None, num_bins=DEFAULT_NUM_BINS, refine=False, maxfev=5000):
+    """
+    Fits the same data in full and in approximate (binned) mode, and reports
+    how far the approximate parameters land from the full fit.
+
+    Returns a dict with both parameter sets, the relative difference per
+    parameter, the RMS curve difference relative to the y range, and timings.
+    """
+    x = np.asarray(x_data, dtype=float)
+    y = np.asarray(y_data, dtype=float)
+
+    start = time.perf_counter()
+    popt_full, _ = curve_fit(model, x, y, p0=p0, maxfev=maxfev)
+    time_full = time.perf_counter() - start
+
+    start = time.perf_counter()
+    x_bin, y_bin, sigma_bin, _ = bin_data(x, y, num_bins)
+    popt_approx, _ = fit_curve(model, x_bin, y_bin, sigma=sigma_bin,
+                               refine_data=(x, y) if refine else None, p0=p0, maxfev=maxfev)
+    time_approx = time.perf_counter() - start
+
+    rel_diff = np.abs(popt_approx - popt_full) / np.maximum(np.abs(popt_full), 1e-12)
+    curve_diff = model(x, *popt_approx) - model(x, *popt_full)
+    y_range = np.ptp(y) or 1.0
+    return {
+        'params_full': popt_full,
+        'params_approx': popt_approx,
+        'param_rel_diff': rel_diff,
+        'max_param_rel_diff': float(np.max(rel_diff)),
+        'curve_rms_rel_diff': float(np.sqrt(np.mean(curve_diff ** 2)) / y_range),
+        'time_full': time_full,
+        'time_approx': time_approx,
+        'speedup': time_full / time_approx if time_approx > 0 else float('inf'),
+    }
+
+
+if __name__ == "__main__":
+    # Benchmark on synthetic noisy data: python -m app.binned_fit
+    from app.data_processing import exponential_model, linear_model, power_model
+
+    rng = np.random.default_rng(0)
+    n_points = 1_000_000
+    x_bench = np.sort(rng.uniform(0.1, 1.0, n_points))
+    logistic = lambda x, L, k, x0: L / (1 + np.exp(-k * (x - x0)))
+    cases = [
+        ("Exponential", exponential_model, (2.0, 3.0), (1.0, 1.0)),
+        ("Linear", linear_model, (1.5, 0.5), None),
+        ("Power", power_model, (2.0, 1.7, 0.3), (1.0, 1.0, 0.0)),
+        ("Logistic", logistic, (5.0, 12.0, 0.5), (4.0, 10.0, 0.5)),
+    ]
+    print(f"{n_points} points, {DEFAULT_NUM_BINS} bins")
+    for name, model, true_params, p0 in cases:
+        y_clean = model(x_bench, *true_params)
+        y_bench = y_clean + rng.normal(scale=0.02 * np.ptp(y_clean), size=n_points)
+        for refine in (False, True):
+            report = benchmark_binned_fit(model, x_bench, y_bench, p0=p0, refine=refine)
+            print(f"{name:<12} refine={refine!s:<5} "
+                  f"max param rel diff={report['max_param_rel_diff']:.2e}  "
+                  f"curve rms rel diff={report['curve_rms_rel_diff']:.2e}  "
+                  f"speedup={report['speedup']:.1f}x")
@@ -1,11 +1,13 @@
 # app/data_processing.py
 import numpy as np
 from scipy.interpolate import interp1d
-from scipy.optimize import curve_fit
-from scipy.signal import savgol_filter
+
+from app.binned_fit import bin_data, fit_curve, MIN_NUM_BINS
+from app.smoothing import smooth
 
 
 FIT_MODELS = ["None", "Exponential", "Linear", "Polynomial", "Logarithmic", "Power", "Moving Average", "Logistic"]
+CURVE_FIT_MODELS = ["Exponential", "Linear", "Logarithmic", "Power", "Logistic"]  # Support p0/maxfev and binned fits
 
 # --- Define Model Functions ---
 def linear_model(x, m, c):
@@ -40,21 +42,15 @@ def logistic_model(x, l, k, x0, b):
     """
     return l / (1 + np.exp(-k * (x - x0)))
 
-def moving_average_model(y_data, window_size, poly_order=2):
+def moving_average_model(y_data, window_size, poly_order=2, kind="Savitzky-Golay"):
     """
-    Applies a Savitzky-Golay filter, which is a type of moving average
-    that can also fit a polynomial to the window.
-    window_size must be odd and > poly_order.
+    Applies a chunked smoothing filter (see app.smoothing). The default
+    Savitzky-Golay filter is a type of moving average that can also fit a
+    polynomial to the window.
+    window_size must be odd (except for EMA), > poly_order for Savitzky-Golay,
+    and no longer than the data for Savitzky-Golay; otherwise ValueError is raised.
     """
-    if window_size <= poly_order:
-        print(f"Warning: Moving average window_size ({window_size}) must be > poly_order ({poly_order}). Setting to poly_order+1 or +2.")
-        window_size = poly_order + 1 if (poly_order + 1) % 2 != 0 else poly_order + 2
-    if window_size % 2 == 0:  # Ensure odd
-        window_size += 1
-    if len(y_data) < window_size:
-        print(f"Warning: Data length ({len(y_data)}) is less than window size ({window_size}). Returning original data.")
-        return y_data
-    return savgol_filter(y_data, window_size, poly_order)
+    return smooth(y_data, window_size, kind=kind, poly_order=poly_order)
 
 def exponential_model(x, a, b):
     return a * np.exp(b * x)
@@ -84,6 +80,7 @@ def process_data(x_values, y_values, num_samples, fit_model_name="Exponential",
         x_uniform = np.linspace(min_v, max_v, num_samples)
         y_uniform = f_interp(x_uniform)
 
+    x_fit = x_uniform
     y_fit = None
     label_fit = "Fit Failed"
     params_out = {}
@@ -92,6 +89,23 @@ def process_data(x_values, y_values, num_samples, fit_model_name="Exponential",
     user_p0 = fit_params.get('p0', None)
     user_maxfev = fit_params.get('maxfev', None)  # SciPy's default will be used if None
 
+    # --- Approximate mode: fit adaptive x-bins of the cleaned data, weighted by 1/variance ---
+    x_src, y_src, sigma_src, refine_xy = x_uniform, y_uniform, None, None
+    approx_bins = fit_params.get('approx_bins', 0)
+    use_binned = approx_bins is not None and approx_bins > 0 and fit_model_name in CURVE_FIT_MODELS
+    binned_note = ''
+    if use_binned:
+        approx_bins = max(approx_bins, MIN_NUM_BINS)  # Fewer bins than parameters cannot be fitted
+        x_src, y_src, sigma_src, _ = bin_data(x_values_clean, y_values_clean, approx_bins)
+        if len(x_src) < MIN_NUM_BINS:  # Too few distinct x values to bin; fit the data as usual
+            print(f"Binned fit skipped: only {len(x_src)} x-bins (need {MIN_NUM_BINS}). Using the full fit.")
+            binned_note = f' [Unbinned: only {len(x_src)} x-bins]'
+            x_src, y_src, sigma_src = x_uniform, y_uniform, None
+        else:
+            if fit_params.get('approx_refine', False):  # One more pass on the full data from the binned params
+                refine_xy = (x_values_clean, y_values_clean)
+            binned_note = f' [Binned: {len(x_src)}{", refined" if refine_xy is not None else ""}]'
+
     try:
         if fit_model_name == "Exponential":
             default_p0_exp = (1e-9, 10)
@@ -103,7 +117,7 @@ def process_data(x_values, y_values, num_samples, fit_model_name="Exponential",
             else:  # Use a reasonable default if not specified or invalid
                 curve_fit_kwargs['maxfev'] = 5000
 
-            popt, pcov = curve_fit(exponential_model, x_uniform, y_uniform, **curve_fit_kwargs)
+            popt, pcov = fit_curve(exponential_model, x_src, y_src, sigma_src, refine_xy, **curve_fit_kwargs)
             y_fit = exponential_model(x_uniform, *popt)
             params_out = {'a': popt[0], 'b': popt[1]}
             label_fit = f'Exp: I = {popt[0]:.2e}·e^({popt[1]:.2f}·V)'
@@ -115,7 +129,7 @@ def process_data(x_values, y_values, num_samples, fit_model_name="Exponential",
             if user_maxfev is not None and user_maxfev > 0:
                 curve_fit_kwargs['maxfev'] = user_maxfev
 
-            popt, pcov = curve_fit(linear_model, x_uniform, y_uniform, **curve_fit_kwargs)
+            popt, pcov = fit_curve(linear_model, x_src, y_src, sigma_src, refine_xy, **curve_fit_kwargs)
             y_fit = linear_model(x_uniform, *popt)
             params_out = {'m': popt[0], 'c': popt[1]}
             label_fit = f'Lin: I = {popt[0]:.2f}·V + {popt[1]:.2f}'
@@ -132,7 +146,8 @@ def process_data(x_values, y_values, num_samples, fit_model_name="Exponential",
             label_fit = f'Poly (Ord {order}): I = {" + ".join(terms)}'.replace('V^0', '').replace('·V^1 ', '·V ')
 
         elif fit_model_name == "Logarithmic":
-            v_shifted = x_uniform - np.min(x_uniform) + 1e-6
+            x_shift = np.min(x_uniform)
+            v_shifted = x_uniform - x_shift + 1e-6
             default_p0_log = (np.mean(y_uniform), 1.0)  # a, b for a*log(x)+b
             p0_to_use = user_p0 if user_p0 is not None else default_p0_log
 
@@ -143,10 +158,13 @@ def process_data(x_values, y_values, num_samples, fit_model_name="Exponential",
                 curve_fit_kwargs['maxfev'] = 5000
 
             try:  # Attempt with shifted x first for stability if x starts near 0
-                popt, pcov = curve_fit(lambda x, a, b: a * np.log(x) + b, v_shifted, y_uniform, **curve_fit_kwargs)
+                refine_shifted = (refine_xy[0] - x_shift + 1e-6, refine_xy[1]) if refine_xy is not None else None
+                popt, pcov = fit_curve(lambda x, a, b: a * np.log(x) + b, x_src - x_shift + 1e-6, y_src, sigma_src,
+                                       refine_shifted, **curve_fit_kwargs)
                 y_fit = popt[0] * np.log(v_shifted) + popt[1]
             except RuntimeError:  # Fallback to original x if shifted fails or if user prefers direct fit
-                popt, pcov = curve_fit(lambda x, a, b: a * np.log(x - np.min(x) + 1e-9) + b, x_uniform, y_uniform, **curve_fit_kwargs)
+                popt, pcov = fit_curve(lambda x, a, b: a * np.log(x - x_shift + 1e-9) + b, x_src, y_src, sigma_src,
+                                       refine_xy, **curve_fit_kwargs)
                 y_fit = popt[0] * np.log(x_uniform - np.min(x_uniform) + 1e-9) + popt[1]
 
             params_out = {'a': popt[0], 'b': popt[1]}
@@ -170,7 +188,7 @@ def process_data(x_values, y_values, num_samples, fit_model_name="Exponential",
             else:
                 curve_fit_kwargs['maxfev'] = 5000
 
-            popt, pcov = curve_fit(power_model, x_uniform, y_uniform, **curve_fit_kwargs)
+            popt, pcov = fit_curve(power_model, x_src, y_src, sigma_src, refine_xy, **curve_fit_kwargs)
             y_fit = power_model(x_uniform, *popt)
             params_out = {'a': popt[0], 'b': popt[1], 'c': popt[2]}
             label_fit = f'Pow: I = {popt[0]:.2e}·V^{{{popt[1]:.2f}}} + {popt[2]:.2e}'
@@ -188,7 +206,8 @@ def process_data(x_values, y_values, num_samples, fit_model_name="Exponential",
             else:
                 curve_fit_kwargs['maxfev'] = 8000  # Logistic often needs more
 
-            popt, pcov = curve_fit(lambda x, L, k, x0: L / (1 + np.exp(-k * (x - x0))), x_uniform, y_uniform, **curve_fit_kwargs)
+            popt, pcov = fit_curve(lambda x, L, k, x0: L / (1 + np.exp(-k * (x - x0))), x_src, y_src, sigma_src, refine_xy,
+                                   **curve_fit_kwargs)
             y_fit = popt[0] / (1 + np.exp(-popt[1] * (x_uniform - popt[2])))
             params_out = {'L': popt[0], 'k': popt[1], 'x0': popt[2]}
             label_fit = f'Logis: L={popt[0]:.2e}, k={popt[1]:.2f}, V₀={popt[2]:.2f}'
@@ -197,8 +216,23 @@ def process_data(x_values, y_values, num_samples, fit_model_name="Exponential",
         elif fit_model_name == "Moving Average":  # p0/maxfev not applicable
             period = fit_params.get('mov_avg_period', 5)
             poly_order_ma = fit_params.get('mov_avg_poly_order', 2)
-            y_fit = moving_average_model(y_uniform, period, poly_order_ma)
-            label_fit = f'MovAvg (P:{period}, O:{poly_order_ma})'
+            kind_ma = fit_params.get('mov_avg_kind', "Savitzky-Golay")
+            try:
+                if fit_params.get('mov_avg_source', "Interpolated") == "Raw":  # Smooth the cleaned samples directly
+                    order = np.argsort(x_values_clean, kind='stable')  # Windows must span x-neighbours, not file rows
+                    x_fit = x_values_clean[order]
+                    y_fit = moving_average_model(y_values_clean[order], period, poly_order_ma, kind_ma)
+                else:
+                    y_fit = moving_average_model(y_uniform, period, poly_order_ma, kind_ma)
+                if kind_ma == "Savitzky-Golay":
+                    label_fit = f'MovAvg (P:{period}, O:{poly_order_ma})'
+                else:
+                    label_fit = f'MovAvg {kind_ma} (P:{period})'
+            except ValueError as e:  # Invalid window settings; show the reason rather than just the type
+                print(f"ValueError during {fit_model_name} fit: {e}")
+                label_fit = f'{fit_model_name} Fit Failed: {e}'
+                x_fit = x_uniform
+                y_fit = np.zeros_like(x_uniform)
 
         elif fit_model_name == "None":
             y_fit = np.zeros_like(x_uniform)  # Or y_fit = None
@@ -208,18 +242,23 @@ def process_data(x_values, y_values, num_samples, fit_model_name="Exponential",
             label_fit = f"Unknown Model: {fit_model_name}"
             y_fit = np.zeros_like(x_uniform)  # Or y_fit = None
 
+        label_fit += binned_note  # Only reached when the fit succeeded
+
     # ... (exception handling - unchanged) ...
     except RuntimeError as e:
         print(f"RuntimeError during {fit_model_name} fit: {e}")
         label_fit = f'{fit_model_name} Fit Failed (Runtime)'
+        x_fit = x_uniform
         y_fit = np.zeros_like(x_uniform)
     except TypeError as e:
         print(f"TypeError during {fit_model_name} fit (often bad p0 or data): {e}")
         label_fit = f'{fit_model_name} Fit Failed (Type)'
+        x_fit = x_uniform
         y_fit = np.zeros_like(x_uniform)
     except Exception as e:  # Catch any other fitting error
         print(f"Unexpected error during {fit_model_name} fit: {e}")
         label_fit = f'{fit_model_name} Fit Failed (Error: {type(e).__name__})'
+        x_fit = x_uniform
         y_fit = np.zeros_like(x_uniform)
 
-    return (x_values_clean, y_values_clean), (x_uniform, y_uniform), (x_uniform, y_fit), label_fit
\ No newline at end of file
+    return (x_values_clean, y_values_clean), (x_uniform, y_uniform), (x_fit, y_fit), label_fit
\ No newline at end of file
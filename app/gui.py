@@ -2,7 +2,9 @@ import dearpygui.dearpygui as dpg
 import threading
 
 from app.excel_reader import ExcelReader
-from app.data_processing import process_data, FIT_MODELS
+from app.binned_fit import DEFAULT_NUM_BINS, MIN_NUM_BINS
+from app.data_processing import process_data, FIT_MODELS, CURVE_FIT_MODELS
+from app.smoothing import SMOOTHING_KINDS
 from app.theme import apply_theme, ALL_THEMES, Theme
 from app.matplotlib import plot_with_matplotlib_actual, set_latest_plot_data
 
@@ -14,7 +16,7 @@ P0_HINTS = {
     "Power": "a, b, c for a*x^b+c (e.g., 1.0, 2.0, 0.0)",
     "Logistic": "L, k, x0 (e.g., max_y, 1.0, mid_x)",
     "Polynomial": "N/A (uses polyfit)",
-    "Moving Average": "N/A (uses SavGol filter)",
+    "Moving Average": "N/A (uses smoothing filter)",
     "None": "N/A"
 }
 
@@ -56,8 +58,7 @@ def fit_model_selection_changed_callback(sender, app_data, user_data):
         dpg.configure_item("mov_avg_period_input_group", show=show_mov_avg_group)
 
     # --- Visibility and Hint for common advanced curve_fit options (p0, maxfev) ---
-    models_using_curve_fit_adv_opts = ["Exponential", "Linear", "Logarithmic", "Power", "Logistic"]
-    show_advanced_fit_opts = selected_model in models_using_curve_fit_adv_opts
+    show_advanced_fit_opts = selected_model in CURVE_FIT_MODELS
 
     if dpg.does_item_exist("advanced_fit_options_group"):
         dpg.configure_item("advanced_fit_options_group", show=show_advanced_fit_opts)
@@ -76,6 +77,12 @@ def fit_model_selection_changed_callback(sender, app_data, user_data):
             dpg.set_value("p0_tooltip_text_item", "")  # Clear tooltip text if not applicable
 
 
+def mov_avg_kind_changed_callback(sender, app_data, user_data):
+    # Only the Savitzky-Golay filter uses a polynomial order
+    if dpg.does_item_exist("mov_avg_poly_order_input"):
+        dpg.configure_item("mov_avg_poly_order_input", show=dpg.get_value(sender) == "Savitzky-Golay")
+
+
 def update_plot_callback(sender, app_data, user_data):
     # ... (initializations and Excel reading as before) ...
     plot_title_text = "Y vs X"
@@ -105,6 +112,8 @@ def update_plot_callback(sender, app_data, user_data):
             fit_parameters['poly_order'] = int(dpg.get_value("poly_order_input"))
         elif selected_fit_model == "Moving Average":
             fit_parameters['mov_avg_period'] = int(dpg.get_value("mov_avg_period_input"))
+            fit_parameters['mov_avg_kind'] = dpg.get_value("mov_avg_kind_combo")
+            fit_parameters['mov_avg_source'] = dpg.get_value("mov_avg_source_combo")
             if dpg.does_item_exist("mov_avg_poly_order_input"):  # Check if the field exists and is visible
                 if dpg.is_item_shown("mov_avg_poly_order_input"):  # Redundant if group visibility is managed
                     fit_parameters['mov_avg_poly_order'] = int(dpg.get_value("mov_avg_poly_order_input"))
@@ -126,6 +135,10 @@ def update_plot_callback(sender, app_data, user_data):
             maxfev_val = dpg.get_value("maxfev_input_int")  # New tag for maxfev int input
             if maxfev_val > 0:  # Or some other sensible check, maybe it can be None/0 to use default
                 fit_parameters['maxfev'] = maxfev_val
+
+            if dpg.get_value("approx_fit_checkbox"):
+                fit_parameters['approx_bins'] = int(dpg.get_value("approx_bins_input"))
+                fit_parameters['approx_refine'] = dpg.get_value("approx_refine_checkbox")
         # --- End of reading advanced options ---
 
         # ... (Excel reading logic as before) ...
@@ -236,10 +249,15 @@ def setup_gui():
                         dpg.add_input_int(label="Polynomial Order", tag="poly_order_input", default_value=2, width=-1,
                                           min_value=0, max_value=10, step=1)
                     with dpg.group(tag="mov_avg_period_input_group", show=False, indent=10):
+                        dpg.add_combo(items=SMOOTHING_KINDS, label="MA Filter", tag="mov_avg_kind_combo",
+                                      default_value="Savitzky-Golay", width=-1,
+                                      callback=mov_avg_kind_changed_callback)
+                        dpg.add_combo(items=["Interpolated", "Raw"], label="MA Source", tag="mov_avg_source_combo",
+                                      default_value="Interpolated", width=-1)
                         dpg.add_input_int(label="MA Period", tag="mov_avg_period_input", default_value=5, width=-1,
-                                          min_value=3, step=2)
+                                          min_value=3, min_clamped=True, step=2)
                         dpg.add_input_int(label="MA Poly Order", tag="mov_avg_poly_order_input", default_value=2,
-                                          width=-1, min_value=0, step=1)
+                                          width=-1, min_value=0, min_clamped=True, step=1)
 
                     # --- Common Advanced Fit Options for curve_fit ---
                     with dpg.group(tag="advanced_fit_options_group", show=False):
@@ -251,6 +269,14 @@ def setup_gui():
                         with dpg.tooltip(parent="maxfev_input_int", tag="maxfev_tooltip"):
                             dpg.add_text("Maximum number of calls to the function by curve_fit. 0 or blank uses SciPy's default.")
 
+                        dpg.add_checkbox(label="Approximate (Binned) Fit", tag="approx_fit_checkbox", default_value=False)
+                        with dpg.tooltip(parent="approx_fit_checkbox"):
+                            dpg.add_text("Fit per-bin means of the raw data, weighted by inverse variance. "
+                                         "Much faster on very large datasets.", wrap=250)
+                        dpg.add_input_int(label="Bins", default_value=DEFAULT_NUM_BINS, tag="approx_bins_input", width=160,
+                                          min_value=MIN_NUM_BINS, min_clamped=True, step=50)
+                        dpg.add_checkbox(label="Refine on Full Data", tag="approx_refine_checkbox", default_value=False)
+
                 # ... (Plot Options, Appearance, Update Plot button, Status text - as before) ...
                 with dpg.collapsing_header(label="Plot Options", default_open=False):
                     dpg.add_checkbox(label="Enable Crosshairs", tag="crosshair_checkbox", default_value=False,
@@ -0,0 +1,149 @@
+# app/smoothing.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.ndimage import median_filter
+from scipy.signal import lfilter, savgol_filter
+
+
+SMOOTHING_KINDS = ["Savitzky-Golay", "Moving Mean", "EMA", "Running Median"]
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # samples per chunk, excluding the overlap
+
+
+# --- Per-chunk kernels (operate on an in-memory slice) ---
+def _savgol_chunk(y, window, poly_order):
+    return savgol_filter(y, window, poly_order)
+
+def _moving_mean_chunk(y, window):
+    """Centered mean via a cumulative sum; the window shrinks at the array edges."""
+    half = window // 2
+    n = len(y)
+    offset = np.mean(y)  # Centering keeps the running sum small, limiting rounding drift
+    csum = np.empty(n + 1)
+    csum[0] = 0.0
+    np.cumsum(y - offset, out=csum[1:])
+    idx = np.arange(n)
+    lo = np.maximum(idx - half, 0)
+    hi = np.minimum(idx + half + 1, n)
+    return (csum[hi] - csum[lo]) / (hi - lo) + offset
+
+def _running_median_chunk(y, window):
+    return median_filter(y, size=window, mode='nearest')
+
+def _ema_chunk(y, alpha):
+    """EMA of the chunk started from a zero state; the carry is added afterwards."""
+    return lfilter([alpha], [1.0, alpha - 1.0], y)
+
+
+def _chunk_bounds(n, chunk_size, window):
+    """Split [0, n) into [start, stop) ranges, folding a short tail into the previous chunk."""
+    starts = list(range(0, n, chunk_size))
+    if len(starts) > 1 and n - starts[-1] < window:
+        starts.pop()
+    stops = starts[1:] + [n]
+    return list(zip(starts, stops))
+
+
+def _smooth_windowed(y, out, bounds, half, kernel, workers):
+    """Run a centered-window kernel over overlapping chunks and keep only each chunk's core."""
+    n = len(y)
+
+    def run(bound):
+        start, stop = bound
+        lo = max(start - half, 0)
+        hi = min(stop + half, n)
+        smoothed = kernel(np.asarray(y[lo:hi], dtype=float))
+        out[start:stop] = smoothed[start - lo:start - lo + (stop - start)]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(run, bounds))
+    return out
+
+
+def _smooth_ema(y, out, bounds, window, workers):
+    """
+    EMA is a first-order recursion, so chunks are filtered from a zero state in
+    parallel, then corrected with the decayed carry from the previous chunk:
+    y_true[i] = y_zero[i] + (1 - alpha)^(i + 1) * carry.
+    """
+    alpha = 2.0 / (window + 1)
+    decay = 1.0 - alpha
+
+    def filter_chunk(bound):
+        start, stop = bound
+        out[start:stop] = _ema_chunk(np.asarray(y[start:stop], dtype=float), alpha)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(filter_chunk, bounds))
+
+        # Seeding with y[0] makes the first output equal the first sample.
+        carries = []
+        carry = float(y[0])
+        for start, stop in bounds:
+            carries.append(carry)
+            carry = out[stop - 1] + decay ** (stop - start) * carry
+
+        def apply_carry(args):
+            (start, stop), carry_in = args
+            powers = decay ** np.arange(1, stop - start + 1)
+            out[start:stop] += powers * carry_in
+
+        list(pool.map(apply_carry, zip(bounds, carries)))
+    return out
+
+
+def smooth(y_data, window_size, kind="Savitzky-Golay", poly_order=2,
+           chunk_size=DEFAULT_CHUNK_SIZE, workers=None, out=None):
+    """
+    Smooths a 1-D series in overlapping chunks spread across worker threads.
+
+    y_data may be any sliceable 1-D array, including a np.memmap; only one
+    chunk plus its overlap is loaded per worker at a time. Pass a (memory-mapped)
+    array as out to avoid allocating the result in memory.
+
+    Chunks overlap by window_size // 2 on each side, so the result matches the
+    whole-array filter: exactly for Savitzky-Golay and Running Median, and up to
+    floating-point rounding for Moving Mean and EMA.
+
+    kind: one of SMOOTHING_KINDS
+        "Savitzky-Golay" - polynomial of poly_order fitted in each window
+        "Moving Mean"    - centered mean, window shrinks at the edges
+        "EMA"            - exponential moving average, alpha = 2 / (window_size + 1)
+        "Running Median" - centered median, edges padded with the nearest sample
+    """
+    if kind not in SMOOTHING_KINDS:
+        raise ValueError(f"Unknown smoothing kind: {kind}")
+    if window_size < 1:
+        raise ValueError(f"window_size ({window_size}) must be >= 1.")
+    if kind != "EMA" and window_size % 2 == 0:
+        raise ValueError(f"window_size ({window_size}) must be odd for a centered {kind} filter.")
+    if kind == "Savitzky-Golay" and window_size <= poly_order:
+        raise ValueError(f"window_size ({window_size}) must be > poly_order ({poly_order}).")
+
+    n = len(y_data)
+    if out is None:
+        out = np.empty(n, dtype=float)
+    elif len(out) != n:
+        raise ValueError(f"out length ({len(out)}) does not match data length ({n}).")
+    if n == 0:
+        return out
+    if kind == "Savitzky-Golay" and n < window_size:
+        raise ValueError(f"Data length ({n}) is less than window size ({window_size}).")
+
+    chunk_size = max(int(chunk_size), window_size)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    bounds = _chunk_bounds(n, chunk_size, window_size)
+
+    if kind == "EMA":
+        return _smooth_ema(y_data, out, bounds, window_size, workers)
+
+    if kind == "Savitzky-Golay":
+        kernel = lambda chunk: _savgol_chunk(chunk, window_size, poly_order)
+    elif kind == "Moving Mean":
+        kernel = lambda chunk: _moving_mean_chunk(chunk, window_size)
+    else:
+        kernel = lambda chunk: _running_median_chunk(chunk, window_size)
+    return _smooth_windowed(y_data, out, bounds, window_size // 2, kernel, workers)
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from app.binned_fit import bin_data, fit_curve, MIN_NUM_BINS
+from app.data_processing import process_data, exponential_model
+
+
+def _reference_bins(x, y, num_bins):
+    edges = np.quantile(x, np.linspace(0.0, 1.0, num_bins + 1))
+    idx = np.searchsorted(edges[1:-1], x, side='right')
+    groups = [(x[idx == i], y[idx == i]) for i in range(num_bins)]
+    return (np.array([gx.mean() for gx, _ in groups]),
+            np.array([gy.mean() for _, gy in groups]),
+            np.array([gy.std(ddof=1) / np.sqrt(len(gy)) for _, gy in groups]))
+
+
+def test_bin_statistics_match_per_bin_reference():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, 1, 20000)
+    y = 1e9 + 5 * x + rng.normal(size=x.size)
+    x_mean, y_mean, y_sigma, counts = bin_data(x, y, 40)
+    ref_x, ref_y, ref_sigma = _reference_bins(x, y, 40)
+
+    assert counts.sum() == len(x)
+    np.testing.assert_allclose(x_mean, ref_x)
+    np.testing.assert_allclose(y_mean, ref_y, rtol=0, atol=1e-4)
+    np.testing.assert_allclose(y_sigma, ref_sigma, rtol=1e-9)
+
+
+def test_bin_sigma_precise_when_y_range_dwarfs_noise():
+    rng = np.random.default_rng(3)
+    levels = np.arange(40.0)
+    x = np.repeat(levels, 500)
+    y = 1e6 * x + rng.normal(scale=1e-3, size=x.size)
+    _, _, y_sigma, _ = bin_data(x, y, 40)
+    ref_sigma = np.array([y[x == level].std(ddof=1) / np.sqrt(500) for level in levels])
+
+    np.testing.assert_allclose(y_sigma, ref_sigma, rtol=1e-6)
+
+
+def test_repeated_x_levels_get_one_bin_each():
+    x = np.repeat([1.0, 2.0, 3.0], 100)  # Stepped sweep with repeated readings
+    y = 2 * x + np.tile(np.linspace(-0.1, 0.1, 100), 3)
+    x_mean, y_mean, _, counts = bin_data(x, y, 50)
+
+    np.testing.assert_array_equal(x_mean, [1.0, 2.0, 3.0])
+    np.testing.assert_allclose(y_mean, 2 * x_mean)
+    np.testing.assert_array_equal(counts, 100)
+
+
+def test_no_spread_gives_no_sigma():
+    x = np.linspace(0, 1, 100)
+    _, _, y_sigma, _ = bin_data(x, np.full_like(x, 2.0), 10)
+    assert y_sigma is None
+
+
+@pytest.mark.parametrize("refine", [False, True])
+def test_fit_curve_matches_full_fit(refine):
+    rng = np.random.default_rng(1)
+    x = rng.uniform(0.1, 1.0, 100000)
+    y = exponential_model(x, 2.0, 3.0) + rng.normal(scale=0.2, size=x.size)
+    x_bin, y_bin, sigma_bin, _ = bin_data(x, y, 100)
+    popt, _ = fit_curve(exponential_model, x_bin, y_bin, sigma_bin,
+                        (x, y) if refine else None, p0=(1.0, 1.0), maxfev=5000)
+    popt_full, _ = fit_curve(exponential_model, x, y, p0=(1.0, 1.0), maxfev=5000)
+
+    np.testing.assert_allclose(popt, popt_full, rtol=1e-8 if refine else 1e-3)
+
+
+def test_process_data_labels_binned_fits():
+    rng = np.random.default_rng(2)
+    x = np.sort(rng.uniform(0.1, 1.0, 5000))
+    y = exponential_model(x, 2.0, 3.0) + rng.normal(scale=0.05, size=x.size)
+    params = {'p0': [1.0, 1.0], 'approx_bins': 1, 'approx_refine': True}
+    assert process_data(x, y, 100, "Exponential", params)[3].endswith(f"[Binned: {MIN_NUM_BINS}, refined]")
+
+    failed = process_data(x, y, 100, "Logistic", {'approx_bins': 50, 'p0': [1.0, 2.0]})[3]
+    assert "Fit Failed" in failed and "Binned" not in failed
+
+
+def test_process_data_skips_binning_with_too_few_x_levels():
+    x = np.array([1.0, 2.0, 3.0])
+    label = process_data(x, 1.5 * x + 0.5, 100, "Linear", {'approx_bins': 50})[3]
+    assert label.endswith("[Unbinned: only 3 x-bins]")
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from scipy.ndimage import median_filter
+from scipy.signal import lfilter, savgol_filter
+
+from app.data_processing import process_data
+from app.smoothing import smooth, SMOOTHING_KINDS
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    return np.cumsum(rng.normal(size=1000))
+
+
+def _ema_reference(y, window):
+    alpha = 2.0 / (window + 1)
+    return lfilter([alpha], [1.0, alpha - 1.0], y, zi=[(1 - alpha) * y[0]])[0]
+
+
+# chunk_size=97 leaves a 30-sample tail: kept as its own chunk for window 11, folded into the previous one for 31
+@pytest.mark.parametrize("window", [11, 31])
+@pytest.mark.parametrize("chunk_size", [97, 250])
+def test_chunked_matches_whole_array(series, window, chunk_size):
+    np.testing.assert_array_equal(smooth(series, window, chunk_size=chunk_size, workers=4),
+                                  savgol_filter(series, window, 2))
+    np.testing.assert_array_equal(smooth(series, window, kind="Running Median", chunk_size=chunk_size, workers=4),
+                                  median_filter(series, size=window, mode='nearest'))
+    np.testing.assert_allclose(smooth(series, window, kind="EMA", chunk_size=chunk_size, workers=4),
+                               _ema_reference(series, window), rtol=0, atol=1e-10)
+
+    half = window // 2
+    mean = smooth(series, window, kind="Moving Mean", chunk_size=chunk_size, workers=4)
+    np.testing.assert_allclose(mean[half:-half], np.convolve(series, np.ones(window) / window, 'valid'),
+                               rtol=0, atol=1e-10)
+    assert mean[0] == pytest.approx(np.mean(series[:half + 1]))
+
+
+def test_memmap_in_and_out(series, tmp_path):
+    y_map = np.memmap(tmp_path / "y.dat", dtype=float, mode='w+', shape=series.shape)
+    y_map[:] = series
+    out_map = np.memmap(tmp_path / "out.dat", dtype=float, mode='w+', shape=series.shape)
+    for kind in SMOOTHING_KINDS:
+        smooth(y_map, 11, kind=kind, chunk_size=100, out=out_map)
+        np.testing.assert_allclose(out_map, smooth(series, 11, kind=kind, chunk_size=len(series)),
+                                   rtol=0, atol=1e-10)
+
+
+@pytest.mark.parametrize("window, kind, poly_order", [(4, "Savitzky-Golay", 2), (3, "Savitzky-Golay", 3),
+                                                      (4, "Moving Mean", 2), (0, "EMA", 2)])
+def test_invalid_window_raises(series, window, kind, poly_order):
+    with pytest.raises(ValueError):
+        smooth(series, window, kind=kind, poly_order=poly_order)
+
+
+@pytest.mark.parametrize("kind", SMOOTHING_KINDS)
+def test_raw_moving_average_ignores_row_order(kind):
+    rng = np.random.default_rng(1)
+    x = rng.uniform(0, 1, 500)
+    y = np.sin(6 * x) + rng.normal(scale=0.05, size=500)
+    params = {'mov_avg_source': "Raw", 'mov_avg_kind': kind}
+    _, _, (fit_x, fit_y), _ = process_data(x, y, 100, "Moving Average", params)
+    perm = rng.permutation(500)
+    _, _, (_, fit_y_shuffled), _ = process_data(x[perm], y[perm], 100, "Moving Average", params)
+
+    assert np.all(np.diff(fit_x) >= 0)
+    np.testing.assert_allclose(fit_y, fit_y_shuffled)
+
+
+def test_moving_average_error_in_label():
+    x = np.linspace(0, 1, 50)
+    _, _, _, label = process_data(x, x ** 2, 30, "Moving Average", {'mov_avg_period': 4})
+    assert label.startswith("Moving Average Fit Failed:") and "odd" in label